@@ -136,13 +136,15 @@ class Actions(ABC):
         """Compares the actions to a tensor of actions.
 
         Args:
-            other: tensor of actions to compare, with shape (*batch_shape, *action_shape).
+            other: tensor of actions to compare, with shape (*batch_shape, *action_shape),
+                or with shape action_shape, in which case it is broadcast over the batch.
 
         Returns: boolean tensor of shape batch_shape indicating whether the actions are
             equal.
         """
-        assert (
-            other.shape == self.batch_shape + self.action_shape
+        assert other.shape in (
+            self.batch_shape + self.action_shape,
+            self.action_shape,
         ), f"Expected shape {self.batch_shape + self.action_shape}, got {other.shape}."
         out = self.tensor == other
         n_batch_dims = len(self.batch_shape)
@@ -156,15 +158,9 @@ class Actions(ABC):
     @property
     def is_dummy(self) -> torch.Tensor:
         """Returns a boolean tensor of shape `batch_shape` indicating whether the actions are dummy actions."""
-        dummy_actions_tensor = self.__class__.dummy_action.repeat(
-            *self.batch_shape, *((1,) * len(self.__class__.action_shape))
-        )
-        return self.compare(dummy_actions_tensor)
+        return self.compare(self.__class__.dummy_action)
 
     @property
     def is_exit(self) -> torch.Tensor:
         """Returns a boolean tensor of shape `batch_shape` indicating whether the actions are exit actions."""
-        exit_actions_tensor = self.__class__.exit_action.repeat(
-            *self.batch_shape, *((1,) * len(self.__class__.action_shape))
-        )
-        return self.compare(exit_actions_tensor)
+        return self.compare(self.__class__.exit_action)
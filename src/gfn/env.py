@@ -242,12 +242,15 @@ class Env(ABC):
         states and a boolean tensor indicating sink states in the new batch.
         """
         assert states.batch_shape == actions.batch_shape
-        new_states = states.clone()  # TODO: Ensure this is efficient!
-        valid_states_idx: torch.Tensor = ~states.is_sink_state
+        sink_states_idx: torch.Tensor = states.is_sink_state
+        valid_states_idx: torch.Tensor = ~sink_states_idx
         assert valid_states_idx.shape == states.batch_shape
         assert valid_states_idx.dtype == torch.bool
-        valid_actions = actions[valid_states_idx]
-        valid_states = states[valid_states_idx]
+        # Boolean indexing calls `nonzero` on every use (a host-device sync on GPU),
+        # so the integer indices are computed once and shared.
+        valid_idx = valid_states_idx.nonzero(as_tuple=True)
+        valid_actions = actions[valid_idx]
+        valid_states = states[valid_idx]
 
         if not self.validate_actions(valid_states, valid_actions):
             raise NonValidActionsError(
@@ -255,12 +258,24 @@ class Env(ABC):
             )
 
         new_sink_states_idx = actions.is_exit
-        new_states.tensor[new_sink_states_idx] = self.sf
-        new_sink_states_idx = ~valid_states_idx | new_sink_states_idx
+        # Copies the tensor and sends the exiting states to $s_f$ in a single pass.
+        # Only the tensor is copied: the masks of discrete states are recomputed by
+        # `update_masks`, and are otherwise produced lazily.
+        is_exit = new_sink_states_idx.reshape(
+            *states.batch_shape, *((1,) * len(states.state_shape))
+        )
+        new_states = states.__class__(
+            torch.where(is_exit, self.sf.to(states.tensor.dtype), states.tensor)
+        )
+        new_states._log_rewards = states._log_rewards
+        new_sink_states_idx.logical_or_(sink_states_idx)  # In place, both are fresh.
         assert new_sink_states_idx.shape == states.batch_shape
 
-        not_done_states = new_states[~new_sink_states_idx]
-        not_done_actions = actions[~new_sink_states_idx]
+        # The states which are not done are left untouched by the copy above, so they
+        # are read from `states`, whose masks are already materialized.
+        not_done_idx = (~new_sink_states_idx).nonzero(as_tuple=True)
+        not_done_states = states[not_done_idx]
+        not_done_actions = actions[not_done_idx]
 
         new_not_done_states_tensor = self.step(not_done_states, not_done_actions)
         if not isinstance(new_not_done_states_tensor, torch.Tensor):
@@ -268,7 +283,7 @@ class Env(ABC):
                 "User implemented env.step function *must* return a torch.Tensor!"
             )
 
-        new_states.tensor[~new_sink_states_idx] = new_not_done_states_tensor
+        new_states.tensor[not_done_idx] = new_not_done_states_tensor
 
         return new_states
 
@@ -283,12 +298,14 @@ class Env(ABC):
         states and a boolean tensor indicating initial states in the new batch.
         """
         assert states.batch_shape == actions.batch_shape
-        new_states = states.clone()  # TODO: Ensure this is efficient!
-        valid_states_idx: torch.Tensor = ~new_states.is_initial_state
+        new_states = states.__class__(states.tensor.clone())  # See `_step`.
+        new_states._log_rewards = states._log_rewards
+        valid_states_idx: torch.Tensor = ~states.is_initial_state
         assert valid_states_idx.shape == states.batch_shape
         assert valid_states_idx.dtype == torch.bool
-        valid_actions = actions[valid_states_idx]
-        valid_states = states[valid_states_idx]
+        valid_idx = valid_states_idx.nonzero(as_tuple=True)  # See `_step`.
+        valid_actions = actions[valid_idx]
+        valid_states = states[valid_idx]
 
         if not self.validate_actions(valid_states, valid_actions, backward=True):
             raise NonValidActionsError(
@@ -297,7 +314,7 @@ class Env(ABC):
 
         # Calculate the backward step, and update only the states which are not Done.
         new_not_done_states_tensor = self.backward_step(valid_states, valid_actions)
-        new_states.tensor[valid_states_idx] = new_not_done_states_tensor
+        new_states.tensor[valid_idx] = new_not_done_states_tensor
 
         if isinstance(new_states, DiscreteStates):
             self.update_masks(new_states)
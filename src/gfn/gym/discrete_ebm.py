@@ -77,6 +77,10 @@ class DiscreteEBM(DiscreteEnv):
                 Defaults to "KHot".
         """
         self.ndim = ndim
+        # Bases used to compute the indices of the states in the canonical ordering.
+        exponents = torch.arange(ndim - 1, -1, -1, device=torch.device(device_str))
+        self._canonical_base = 3**exponents
+        self._terminating_canonical_base = 2**exponents
 
         s0 = torch.full((ndim,), -1, dtype=torch.long, device=torch.device(device_str))
         sf = torch.full((ndim,), 2, dtype=torch.long, device=torch.device(device_str))
@@ -149,22 +153,12 @@ class DiscreteEBM(DiscreteEnv):
 
         Returns the next states as tensor of shape (*batch_shape, ndim).
         """
-        # First, we select that actions that replace a -1 with a 0.
-        # Remove singleton dimension for broadcasting.
-        mask_0 = (actions.tensor < self.ndim).squeeze(-1)
-        states.tensor[mask_0] = states.tensor[mask_0].scatter(
-            -1, actions.tensor[mask_0], 0  # Set indices to 0.
+        # Action i replaces s[i % ndim] with i // ndim, i.e. with 0 for the first
+        # ndim actions, and with 1 for the next ndim. A single scatter over the whole
+        # batch avoids the boolean-indexed copies of each group of actions.
+        return states.tensor.scatter(
+            -1, actions.tensor.fmod(self.ndim), actions.tensor // self.ndim
         )
-        # Then, we select that actions that replace a -1 with a 1.
-        mask_1 = (
-            (actions.tensor >= self.ndim) & (actions.tensor < 2 * self.ndim)
-        ).squeeze(
-            -1
-        )  # Remove singleton dimension for broadcasting.
-        states.tensor[mask_1] = states.tensor[mask_1].scatter(
-            -1, (actions.tensor[mask_1] - self.ndim), 1  # Set indices to 1.
-        )
-        return states.tensor
 
     def backward_step(self, states: States, actions: Actions) -> torch.Tensor:
         """Performs a backward step.
@@ -215,8 +209,7 @@ class DiscreteEBM(DiscreteEnv):
         Returns the states indices as tensor of shape (*batch_shape).
         """
         states_raw = states.tensor
-        canonical_base = 3 ** torch.arange(self.ndim - 1, -1, -1, device=self.device)
-        states_indices = (states_raw + 1).mul(canonical_base).sum(-1).long()
+        states_indices = (states_raw + 1).mul(self._canonical_base).sum(-1).long()
         assert states_indices.shape == states.batch_shape
         return states_indices
 
@@ -229,8 +222,9 @@ class DiscreteEBM(DiscreteEnv):
         Returns the indices of the terminating states as tensor of shape (*batch_shape).
         """
         states_raw = states.tensor
-        canonical_base = 2 ** torch.arange(self.ndim - 1, -1, -1, device=self.device)
-        states_indices = (states_raw).mul(canonical_base).sum(-1).long()
+        states_indices = (
+            (states_raw).mul(self._terminating_canonical_base).sum(-1).long()
+        )
         assert states_indices.shape == states.batch_shape
         return states_indices
 
@@ -0,0 +1,95 @@
+"""Numba kernels for the HyperGrid transitions on CPU.
+
+On CPU, the per-element work of a HyperGrid step is tiny compared to the overhead of
+dispatching each torch operation. These kernels perform the whole transition and the
+mask updates in a single pass over the batch. They mirror `_step_kernel` and
+`_backward_step_kernel` in `gfn.gym.hypergrid`.
+
+Requires the optional `numba` dependency.
+"""
+
+from typing import Tuple
+
+import numba
+import numpy as np
+import torch
+
+
+@numba.njit(parallel=True, cache=True)
+def _step(states, actions, height, new_states, forward_masks, backward_masks):
+    batch_size, ndim = states.shape
+    for i in numba.prange(batch_size):
+        # The sink state is filled with -1.
+        is_done = actions[i] == ndim
+        if not is_done:
+            is_done = True
+            for d in range(ndim):
+                if states[i, d] != -1:
+                    is_done = False
+        # Same clamping of the (dummy) actions as the torch kernels.
+        action = min(max(actions[i], 0), ndim - 1)
+        for d in range(ndim):
+            if is_done:
+                value = -1
+            elif d == action:
+                value = states[i, d] + 1
+            else:
+                value = states[i, d]
+            new_states[i, d] = value
+            forward_masks[i, d] = value != height - 1
+            backward_masks[i, d] = value != 0
+        forward_masks[i, ndim] = True
+
+
+@numba.njit(parallel=True, cache=True)
+def _backward_step(states, actions, height, new_states, forward_masks, backward_masks):
+    batch_size, ndim = states.shape
+    for i in numba.prange(batch_size):
+        is_initial = True
+        for d in range(ndim):
+            if states[i, d] != 0:
+                is_initial = False
+        action = min(max(actions[i], 0), ndim - 1)
+        for d in range(ndim):
+            if not is_initial and d == action:
+                value = states[i, d] - 1
+            else:
+                value = states[i, d]
+            new_states[i, d] = value
+            forward_masks[i, d] = value != height - 1
+            backward_masks[i, d] = value != 0
+        forward_masks[i, ndim] = True
+
+
+def _run(
+    kernel, states_tensor: torch.Tensor, actions_tensor: torch.Tensor, height: int
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Runs a kernel over a flattened batch, and restores the batch shape."""
+    batch_shape, ndim = states_tensor.shape[:-1], states_tensor.shape[-1]
+    states = states_tensor.reshape(-1, ndim).numpy()
+    actions = actions_tensor.reshape(-1).numpy()
+
+    new_states = np.empty_like(states)
+    forward_masks = np.empty((states.shape[0], ndim + 1), dtype=np.bool_)
+    backward_masks = np.empty((states.shape[0], ndim), dtype=np.bool_)
+    kernel(states, actions, height, new_states, forward_masks, backward_masks)
+
+    return (
+        torch.from_numpy(new_states).view(*batch_shape, ndim),
+        torch.from_numpy(forward_masks).view(*batch_shape, ndim + 1),
+        torch.from_numpy(backward_masks).view(*batch_shape, ndim),
+    )
+
+
+def step_kernel(
+    states_tensor: torch.Tensor, actions_tensor: torch.Tensor, height: int
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """CPU equivalent of `gfn.gym.hypergrid._step_kernel`."""
+    return _run(_step, states_tensor, actions_tensor, height)
+
+
+def backward_step_kernel(
+    states_tensor: torch.Tensor, actions_tensor: torch.Tensor, height: int
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """CPU equivalent of `gfn.gym.hypergrid._backward_step_kernel`."""
+    return _run(_backward_step, states_tensor, actions_tensor, height)
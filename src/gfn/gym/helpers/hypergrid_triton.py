@@ -0,0 +1,144 @@
+"""Triton kernels for the HyperGrid transitions on GPU.
+
+For the usual HyperGrid settings (small `ndim` and `height`), every tensor involved
+in a step is tiny, and the cost of a step is dominated by kernel launches. These
+kernels perform the whole transition and the mask updates in a single launch, with
+`ndim` and `height` baked in as compile-time constants so that the loop over the
+dimensions is unrolled. They mirror `_step_kernel` and `_backward_step_kernel` in
+`gfn.gym.hypergrid`.
+
+Requires `triton`, which ships with the CUDA builds of PyTorch.
+"""
+
+from typing import Tuple
+
+import torch
+import triton
+import triton.language as tl
+
+# Largest `ndim` for which the kernels are used: each program holds a block of
+# `_BLOCK` x `next_power_of_2(ndim)` states in registers.
+MAX_NDIM = 16
+_BLOCK = 256
+
+
+@triton.jit
+def _step(
+    states_ptr,
+    actions_ptr,
+    new_states_ptr,
+    forward_masks_ptr,
+    backward_masks_ptr,
+    n_rows,
+    NDIM: tl.constexpr,
+    NDIM_P2: tl.constexpr,
+    HEIGHT: tl.constexpr,
+    BLOCK: tl.constexpr,
+):
+    rows = tl.program_id(0) * BLOCK + tl.arange(0, BLOCK)[:, None]
+    cols = tl.arange(0, NDIM_P2)[None, :]
+    row_mask = rows < n_rows
+    mask = row_mask & (cols < NDIM)
+
+    # The sink state is filled with -1, which is also used as padding, and all
+    # other coordinates are non-negative.
+    states = tl.load(states_ptr + rows * NDIM + cols, mask=mask, other=-1)
+    actions = tl.load(actions_ptr + rows, mask=row_mask, other=0)
+    is_done = (tl.max(states, axis=1)[:, None] == -1) | (actions == NDIM)
+    # Same clamping of the (dummy) actions as the torch kernels.
+    actions = tl.minimum(tl.maximum(actions, 0), NDIM - 1)
+
+    new_states = tl.where(cols == actions, states + 1, states)
+    new_states = tl.where(is_done, -1, new_states)
+
+    tl.store(new_states_ptr + rows * NDIM + cols, new_states, mask=mask)
+    tl.store(
+        forward_masks_ptr + rows * (NDIM + 1) + cols,
+        new_states != HEIGHT - 1,
+        mask=mask,
+    )
+    tl.store(forward_masks_ptr + rows * (NDIM + 1) + NDIM, row_mask, mask=row_mask)
+    tl.store(backward_masks_ptr + rows * NDIM + cols, new_states != 0, mask=mask)
+
+
+@triton.jit
+def _backward_step(
+    states_ptr,
+    actions_ptr,
+    new_states_ptr,
+    forward_masks_ptr,
+    backward_masks_ptr,
+    n_rows,
+    NDIM: tl.constexpr,
+    NDIM_P2: tl.constexpr,
+    HEIGHT: tl.constexpr,
+    BLOCK: tl.constexpr,
+):
+    rows = tl.program_id(0) * BLOCK + tl.arange(0, BLOCK)[:, None]
+    cols = tl.arange(0, NDIM_P2)[None, :]
+    row_mask = rows < n_rows
+    mask = row_mask & (cols < NDIM)
+
+    states = tl.load(states_ptr + rows * NDIM + cols, mask=mask, other=0)
+    actions = tl.load(actions_ptr + rows, mask=row_mask, other=0)
+    is_initial = tl.sum((states != 0).to(tl.int32), axis=1)[:, None] == 0
+    actions = tl.minimum(tl.maximum(actions, 0), NDIM - 1)
+
+    new_states = tl.where((cols == actions) & ~is_initial, states - 1, states)
+
+    tl.store(new_states_ptr + rows * NDIM + cols, new_states, mask=mask)
+    tl.store(
+        forward_masks_ptr + rows * (NDIM + 1) + cols,
+        new_states != HEIGHT - 1,
+        mask=mask,
+    )
+    tl.store(forward_masks_ptr + rows * (NDIM + 1) + NDIM, row_mask, mask=row_mask)
+    tl.store(backward_masks_ptr + rows * NDIM + cols, new_states != 0, mask=mask)
+
+
+def _run(
+    kernel, states_tensor: torch.Tensor, actions_tensor: torch.Tensor, height: int
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Launches a kernel over a flattened batch, and restores the batch shape."""
+    batch_shape, ndim = states_tensor.shape[:-1], states_tensor.shape[-1]
+    states = states_tensor.reshape(-1, ndim).contiguous()
+    actions = actions_tensor.reshape(-1).contiguous()
+    n_rows = states.shape[0]
+
+    new_states = torch.empty_like(states)
+    forward_masks = torch.empty(
+        (n_rows, ndim + 1), dtype=torch.bool, device=states.device
+    )
+    backward_masks = torch.empty((n_rows, ndim), dtype=torch.bool, device=states.device)
+    kernel[(triton.cdiv(n_rows, _BLOCK),)](
+        states,
+        actions,
+        new_states,
+        forward_masks,
+        backward_masks,
+        n_rows,
+        NDIM=ndim,
+        NDIM_P2=triton.next_power_of_2(ndim),
+        HEIGHT=height,
+        BLOCK=_BLOCK,
+    )
+
+    return (
+        new_states.view(*batch_shape, ndim),
+        forward_masks.view(*batch_shape, ndim + 1),
+        backward_masks.view(*batch_shape, ndim),
+    )
+
+
+def step_kernel(
+    states_tensor: torch.Tensor, actions_tensor: torch.Tensor, height: int
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Triton equivalent of `gfn.gym.hypergrid._step_kernel`."""
+    return _run(_step, states_tensor, actions_tensor, height)
+
+
+def backward_step_kernel(
+    states_tensor: torch.Tensor, actions_tensor: torch.Tensor, height: int
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Triton equivalent of `gfn.gym.hypergrid._backward_step_kernel`."""
+    return _run(_backward_step, states_tensor, actions_tensor, height)
@@ -49,7 +49,7 @@ class KHotPreprocessor(Preprocessor):
     def preprocess(self, states):
         states_tensor = states.tensor
         assert (
-            states_tensor.dtype == torch.long
+            not states_tensor.is_floating_point()
         ), "K Hot preprocessing only works for integer states"
         states_tensor = states_tensor.long()
         hot = one_hot(states_tensor, self.height).float()
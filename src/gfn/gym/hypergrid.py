@@ -2,16 +2,137 @@
 Copied and Adapted from https://github.com/Tikquuss/GflowNets_Tutorial
 """
 
-from typing import Literal, Tuple
+from typing import Literal, Optional, Tuple
 
 import torch
 from einops import rearrange
 
 from gfn.actions import Actions
-from gfn.env import DiscreteEnv
+from gfn.env import DiscreteEnv, NonValidActionsError
 from gfn.gym.helpers.preprocessors import KHotPreprocessor, OneHotPreprocessor
 from gfn.preprocessors import EnumPreprocessor, IdentityPreprocessor
 from gfn.states import DiscreteStates
+from gfn.utils.common import maybe_compile
+
+_INV_SQRT_2PI = 1.0 / (2 * torch.pi) ** 0.5
+
+
+def _scaled_distance_to_center(states_raw: torch.Tensor, height: int) -> torch.Tensor:
+    """Returns `abs(states_raw / (height - 1) - 0.5)`.
+
+    The subtraction and absolute value are done in place on the result of the
+    division, so that only one float tensor is allocated in eager mode.
+    """
+    return (states_raw / (height - 1)).sub_(0.5).abs_()
+
+
+def _reward_poly(
+    states_raw: torch.Tensor, height: int, R0: float, R1: float, R2: float
+) -> torch.Tensor:
+    """Default HyperGrid reward, written as a single pointwise + reduction chain.
+
+    The thresholds are python constants, which the compiler folds into the generated
+    kernel. Note that `states_raw / (height - 1)` must not be replaced by a product
+    with a precomputed `1 / (height - 1)`: the rounding differs, which flips the
+    threshold comparisons for some heights (e.g. `height=11`). For the same reason,
+    `ax` is not computed in integer arithmetic as `|2 s - (height - 1)|` scaled by
+    `1 / (2 (height - 1))`: the rounding differs on the 0.4 threshold.
+    """
+    ax = _scaled_distance_to_center(states_raw, height)
+    return R0 + (0.25 < ax).prod(-1) * R1 + ((0.3 < ax) * (ax < 0.4)).prod(-1) * R2
+
+
+def _reward_cos(
+    states_raw: torch.Tensor, height: int, R0: float, R1: float
+) -> torch.Tensor:
+    """Cosine HyperGrid reward, written as a single pointwise + reduction chain."""
+    ax = _scaled_distance_to_center(states_raw, height)
+    pdf_input = ax * 5
+    pdf = _INV_SQRT_2PI * torch.exp(-(pdf_input**2) / 2)
+    return R0 + ((torch.cos(ax * 50) + 1) * pdf).prod(-1) * R1
+
+
+def _states_dtype(height: int) -> torch.dtype:
+    """Returns the smallest signed integer dtype representing {-1, ..., height - 1}."""
+    for dtype in (torch.int8, torch.int16, torch.int32):
+        if height - 1 <= torch.iinfo(dtype).max:
+            return dtype
+    return torch.long
+
+
+def _make_masks(
+    states_tensor: torch.Tensor, height: int
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Computes the forward and backward masks of a tensor of HyperGrid states.
+
+    Equivalent to `HyperGrid.update_masks`, but returns the masks as new tensors.
+    """
+    forward_masks = torch.ones(
+        (*states_tensor.shape[:-1], states_tensor.shape[-1] + 1),
+        dtype=torch.bool,
+        device=states_tensor.device,
+    )
+    forward_masks[..., :-1] = states_tensor != height - 1
+    backward_masks = states_tensor != 0
+    return forward_masks, backward_masks
+
+
+def _step_kernel(
+    states_tensor: torch.Tensor, actions_tensor: torch.Tensor, height: int
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Shape-stable HyperGrid forward transition, fused with the mask updates.
+
+    Sink states and states taking the exit action are sent to $s_f$, all other
+    states are incremented along the dimension given by their action. No boolean
+    indexing is used, so that all intermediate shapes only depend on the batch
+    shape, which makes this function capturable as a CUDA graph. The new states are
+    written in place into a single output tensor, without full-size temporaries.
+
+    Args:
+        states_tensor: Tensor of shape (*batch_shape, ndim) of the current states.
+        actions_tensor: Tensor of shape (*batch_shape, 1) of the actions to take.
+        height: Height of the grid.
+
+    Returns the new states tensor, and the new forward and backward masks.
+    """
+    ndim = states_tensor.shape[-1]
+    # The sink state is filled with -1.
+    is_done = (states_tensor == -1).all(-1)
+    is_done.logical_or_(actions_tensor.squeeze(-1) == ndim)
+    new_states_tensor = states_tensor.clone()
+    # The increment of the done states is irrelevant, as they are overwritten.
+    new_states_tensor.scatter_(
+        -1, actions_tensor.clamp(min=0, max=ndim - 1), 1, reduce="add"
+    )
+    new_states_tensor.masked_fill_(is_done.unsqueeze(-1), -1)
+    return new_states_tensor, *_make_masks(new_states_tensor, height)
+
+
+def _backward_step_kernel(
+    states_tensor: torch.Tensor, actions_tensor: torch.Tensor, height: int
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Shape-stable HyperGrid backward transition, fused with the mask updates.
+
+    Initial states are left untouched, all other states are decremented along the
+    dimension given by their action. The initial state is the origin of the grid,
+    so it is the only state without any non-zero coordinate.
+
+    Args:
+        states_tensor: Tensor of shape (*batch_shape, ndim) of the current states.
+        actions_tensor: Tensor of shape (*batch_shape, 1) of the actions to take.
+        height: Height of the grid.
+
+    Returns the new states tensor, and the new forward and backward masks.
+    """
+    ndim = states_tensor.shape[-1]
+    is_initial = ~states_tensor.any(-1, keepdim=True)
+    new_states_tensor = states_tensor.clone()
+    new_states_tensor.scatter_add_(
+        -1,
+        actions_tensor.clamp(min=0, max=ndim - 1),
+        -(~is_initial).to(states_tensor.dtype),
+    )
+    return new_states_tensor, *_make_masks(new_states_tensor, height)
 
 
 class HyperGrid(DiscreteEnv):
@@ -27,8 +148,8 @@ class HyperGrid(DiscreteEnv):
         preprocessor_name: Literal["KHot", "OneHot", "Identity", "Enum"] = "KHot",
     ):
         """HyperGrid environment from the GFlowNets paper.
-        The states are represented as 1-d tensors of length `ndim` with values in
-        {0, 1, ..., height - 1}.
+        The states are represented as 1-d integer tensors of length `ndim` with
+        values in {0, 1, ..., height - 1}.
         A preprocessor transforms the states to the input of the neural network,
         which can be a one-hot, a K-hot, or an identity encoding.
 
@@ -48,10 +169,21 @@ class HyperGrid(DiscreteEnv):
         self.R1 = R1
         self.R2 = R2
         self.reward_cos = reward_cos
-
-        s0 = torch.zeros(ndim, dtype=torch.long, device=torch.device(device_str))
+        # Base used to compute the index of a state in the canonical ordering. The
+        # products are computed in int32 whenever the indices fit, halving the size
+        # of the intermediate tensor; `sum` accumulates integers in int64 regardless.
+        base_dtype = torch.int32 if height**ndim <= 2**31 - 1 else torch.long
+        self._canonical_base = (
+            height ** torch.arange(ndim - 1, -1, -1, device=torch.device(device_str))
+        ).to(base_dtype)
+
+        # The states are stored with the smallest signed integer type that fits the
+        # grid (the sink state is filled with -1), which reduces the memory traffic
+        # of every step compared to int64.
+        dtype = _states_dtype(height)
+        s0 = torch.zeros(ndim, dtype=dtype, device=torch.device(device_str))
         sf = torch.full(
-            (ndim,), fill_value=-1, dtype=torch.long, device=torch.device(device_str)
+            (ndim,), fill_value=-1, dtype=dtype, device=torch.device(device_str)
         )
         n_actions = ndim + 1
 
@@ -82,6 +214,46 @@ class HyperGrid(DiscreteEnv):
             preprocessor=preprocessor,
         )
 
+        # On GPU, the reward and the transitions are each compiled into a single
+        # fused kernel instead of launching one kernel per pointwise op. One reward
+        # function per branch, so that switching `reward_cos` never triggers a
+        # recompilation.
+        reward_fn = _reward_cos if reward_cos else _reward_poly
+        step_fn, backward_step_fn = _step_kernel, _backward_step_kernel
+        # Whether the transitions are a single hand-fused triton launch.
+        self._uses_triton_kernels = False
+        if self.device.type == "cuda":
+            reward_fn = maybe_compile(reward_fn, fullgraph=True, dynamic=True)
+            # Imported here, so that CPU environments never load triton.
+            try:  # triton ships with the CUDA builds of torch.
+                from gfn.gym.helpers import hypergrid_triton
+            except ImportError:
+                hypergrid_triton = None
+            if hypergrid_triton is not None and ndim <= hypergrid_triton.MAX_NDIM:
+                # A single hand-fused launch per step, specialized on ndim and height.
+                step_fn = hypergrid_triton.step_kernel
+                backward_step_fn = hypergrid_triton.backward_step_kernel
+                self._uses_triton_kernels = True
+            else:
+                step_fn = maybe_compile(step_fn, fullgraph=True)
+                backward_step_fn = maybe_compile(backward_step_fn, fullgraph=True)
+        elif self.device.type == "cpu":
+            # On CPU, the torch dispatch overhead dominates the per-element work.
+            try:  # numba is an optional dependency.
+                from gfn.gym.helpers import hypergrid_numba
+            except ImportError:
+                hypergrid_numba = None
+            if hypergrid_numba is not None:
+                step_fn = hypergrid_numba.step_kernel
+                backward_step_fn = hypergrid_numba.backward_step_kernel
+        self._reward_fn = reward_fn
+        self._step_fn = step_fn
+        self._backward_step_fn = backward_step_fn
+
+        # Populated by `enable_cuda_graph`.
+        self._cuda_graph = None
+        self._cuda_graph_batch_shape = None
+
     def update_masks(self, states: type[DiscreteStates]) -> None:
         """Update the masks based on the current states."""
         # Not allowed to take any action beyond the environment height, but
@@ -91,7 +263,44 @@ class HyperGrid(DiscreteEnv):
             states.tensor == self.height - 1,
             allow_exit=True,
         )
-        states.backward_masks = states.tensor != 0
+        torch.ne(states.tensor, 0, out=states.backward_masks)
+
+    def make_states_class(self) -> type[DiscreteStates]:
+        """Returns the HyperGrid States class, see `DiscreteEnv.make_states_class`."""
+
+        class HyperGridStates(super().make_states_class()):
+            @property
+            def is_initial_state(self) -> torch.Tensor:
+                """Returns a tensor of shape `batch_shape` that is True for $s_0$.
+
+                $s_0$ is the origin of the grid, and the sink state is filled with -1,
+                so a state is initial iff none of its coordinates is non-zero. This
+                avoids materializing a batch of $s_0$ to compare against.
+                """
+                return ~self.tensor.any(-1)
+
+            @classmethod
+            def from_step_outputs(
+                cls,
+                tensor: torch.Tensor,
+                forward_masks: torch.Tensor,
+                backward_masks: torch.Tensor,
+                log_rewards: Optional[torch.Tensor] = None,
+            ) -> DiscreteStates:
+                """Wraps the outputs of a step kernel, skipping the checks of `__init__`.
+
+                The kernels always return consistent shapes, so the assertions and
+                default masks of `__init__` are pure python overhead on the hot path.
+                """
+                out = cls.__new__(cls)
+                out.tensor = tensor
+                out.batch_shape = tuple(tensor.shape)[:-1]
+                out.forward_masks = forward_masks
+                out.backward_masks = backward_masks
+                out._log_rewards = log_rewards
+                return out
+
+        return HyperGridStates
 
     def make_random_states_tensor(self, batch_shape: Tuple[int, ...]) -> torch.Tensor:
         """Creates a batch of random states.
@@ -102,12 +311,21 @@ class HyperGrid(DiscreteEnv):
         Returns the batch of random states as tensor of shape (*batch_shape, *state_shape).
         """
         return torch.randint(
-            0, self.height, batch_shape + self.s0.shape, device=self.device
+            0,
+            self.height,
+            batch_shape + self.s0.shape,
+            dtype=self.s0.dtype,
+            device=self.device,
         )
 
     def step(self, states: DiscreteStates, actions: Actions) -> torch.Tensor:
         """Take a step in the environment.
 
+        Note that `_step` does not call this method: it runs a fused transition
+        kernel (see `_step_kernel`) instead, so overriding this method in a subclass
+        has no effect on the transitions unless `_step` is overridden as well. This
+        is the reference implementation used by the generic `DiscreteEnv._step`.
+
         Args:
             states: The current states.
             actions: The actions to take.
@@ -121,6 +339,12 @@ class HyperGrid(DiscreteEnv):
     def backward_step(self, states: DiscreteStates, actions: Actions) -> torch.Tensor:
         """Take a step in the environment in the backward direction.
 
+        Note that `_backward_step` does not call this method: it runs a fused
+        transition kernel (see `_backward_step_kernel`) instead, so overriding this
+        method in a subclass has no effect on the transitions unless `_backward_step`
+        is overridden as well. This is the reference implementation used by the
+        generic `DiscreteEnv._backward_step`.
+
         Args:
             states: The current states.
             actions: The actions to take.
@@ -131,6 +355,127 @@ class HyperGrid(DiscreteEnv):
         assert new_states_tensor.shape == states.tensor.shape
         return new_states_tensor
 
+    def _are_actions_allowed(
+        self,
+        masks: torch.Tensor,
+        actions_tensor: torch.Tensor,
+        is_ignored: torch.Tensor,
+    ) -> torch.Tensor:
+        """Checks the actions against the masks, except for the `is_ignored` states.
+
+        Unlike `is_action_valid`, the masks and actions are not first copied out with a
+        boolean index, so that all shapes only depend on the batch shape. The (dummy)
+        actions of the ignored states are replaced by a valid index before the lookup.
+
+        Args:
+            masks: Tensor of shape (*batch_shape, n) of the allowed actions.
+            actions_tensor: Tensor of shape (*batch_shape, 1) of the actions.
+            is_ignored: Tensor of shape `batch_shape` of the states to ignore.
+
+        Returns a boolean scalar tensor, True if all the actions are allowed.
+        """
+        actions_tensor = actions_tensor.masked_fill(is_ignored.unsqueeze(-1), 0)
+        is_allowed = torch.take_along_dim(masks, actions_tensor, dim=-1).squeeze(-1)
+        return (is_allowed | is_ignored).all()
+
+    def enable_cuda_graph(self, batch_shape: Tuple[int, ...]) -> None:
+        """Captures the forward transition of a batch of states as a CUDA graph.
+
+        Subsequent calls to `_step` with states of the given `batch_shape` replay the
+        captured graph instead of dispatching each kernel from python, which removes
+        the kernel launch overhead dominating small batches. Other batch shapes use
+        the default path.
+
+        Only available with the torch transition kernels: the triton kernel is already
+        a single launch, which a replay would wrap in copies of the static inputs and
+        clones of the static outputs.
+
+        Args:
+            batch_shape: Batch shape of the states the graph is captured for.
+
+        Raises:
+            ValueError: if the environment is not on cuda, or uses the triton kernels.
+        """
+        if self.device.type != "cuda":
+            raise ValueError("CUDA graphs require the environment to be on cuda.")
+        if self._uses_triton_kernels:
+            raise ValueError(
+                "CUDA graphs are slower than the triton transition kernel in use."
+            )
+        batch_shape = tuple(batch_shape)
+
+        self._static_states = self.States.make_initial_states_tensor(batch_shape)
+        self._static_actions = self.Actions.make_dummy_actions(batch_shape).tensor
+
+        # Warmup on a side stream, as required before the capture.
+        stream = torch.cuda.Stream()
+        stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(stream):
+            for _ in range(3):
+                self._step_fn(self._static_states, self._static_actions, self.height)
+        torch.cuda.current_stream().wait_stream(stream)
+
+        self._cuda_graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(self._cuda_graph):
+            self._static_outputs = self._step_fn(
+                self._static_states, self._static_actions, self.height
+            )
+        self._cuda_graph_batch_shape = batch_shape
+
+    def _step(self, states: DiscreteStates, actions: Actions) -> DiscreteStates:
+        """Shape-stable version of `Env._step`, see `_step_kernel`.
+
+        Unlike `Env._step`, neither `step` nor `validate_actions` are called: the
+        actions are checked against the masks by `_are_actions_allowed`.
+
+        Replays the captured CUDA graph when possible, see `enable_cuda_graph`.
+        """
+        # The hot path works on the raw tensors, and only builds States at the end.
+        states_tensor, forward_masks = states.tensor, states.forward_masks
+        actions_tensor = actions.tensor
+        batch_shape = states_tensor.shape[:-1]
+        assert batch_shape == actions_tensor.shape[:-1]
+
+        # Validation stays outside of the (capturable) kernel, as it requires a sync.
+        is_sink = (states_tensor == self.sf).all(-1)
+        if not self._are_actions_allowed(forward_masks, actions_tensor, is_sink):
+            raise NonValidActionsError(
+                "Some actions are not valid in the given states. See `is_action_valid`."
+            )
+
+        if self._cuda_graph is not None and batch_shape == self._cuda_graph_batch_shape:
+            self._static_states.copy_(states_tensor)
+            self._static_actions.copy_(actions_tensor, non_blocking=True)
+            self._cuda_graph.replay()
+            # The static outputs are overwritten by the next replay.
+            outputs = tuple(output.clone() for output in self._static_outputs)
+        else:
+            outputs = self._step_fn(states_tensor, actions_tensor, self.height)
+
+        return self.States.from_step_outputs(*outputs, log_rewards=states._log_rewards)
+
+    def _backward_step(
+        self, states: DiscreteStates, actions: Actions
+    ) -> DiscreteStates:
+        """Shape-stable version of `Env._backward_step`, see `_backward_step_kernel`.
+
+        Unlike `Env._backward_step`, neither `backward_step` nor `validate_actions`
+        are called: the actions are checked against the masks by
+        `_are_actions_allowed`.
+        """
+        states_tensor, backward_masks = states.tensor, states.backward_masks
+        actions_tensor = actions.tensor
+        assert states_tensor.shape[:-1] == actions_tensor.shape[:-1]
+
+        is_initial = ~states_tensor.any(-1)
+        if not self._are_actions_allowed(backward_masks, actions_tensor, is_initial):
+            raise NonValidActionsError(
+                "Some actions are not valid in the given states. See `is_action_valid`."
+            )
+
+        outputs = self._backward_step_fn(states_tensor, actions_tensor, self.height)
+        return self.States.from_step_outputs(*outputs, log_rewards=states._log_rewards)
+
     def reward(self, final_states: DiscreteStates) -> torch.Tensor:
         r"""In the normal setting, the reward is:
         R(s) = R_0 + 0.5 \prod_{d=1}^D \mathbf{1} \left( \left\lvert \frac{s^d}{H-1}
@@ -143,16 +488,12 @@ class HyperGrid(DiscreteEnv):
         Returns the reward as a tensor of shape `batch_shape`.
         """
         final_states_raw = final_states.tensor
-        R0, R1, R2 = (self.R0, self.R1, self.R2)
-        ax = abs(final_states_raw / (self.height - 1) - 0.5)
         if not self.reward_cos:
-            reward = (
-                R0 + (0.25 < ax).prod(-1) * R1 + ((0.3 < ax) * (ax < 0.4)).prod(-1) * R2
+            reward = self._reward_fn(
+                final_states_raw, self.height, self.R0, self.R1, self.R2
             )
         else:
-            pdf_input = ax * 5
-            pdf = 1.0 / (2 * torch.pi) ** 0.5 * torch.exp(-(pdf_input**2) / 2)
-            reward = R0 + ((torch.cos(ax * 50) + 1) * pdf).prod(-1) * R1
+            reward = self._reward_fn(final_states_raw, self.height, self.R0, self.R1)
 
         assert reward.shape == final_states.batch_shape
         return reward
@@ -166,11 +507,7 @@ class HyperGrid(DiscreteEnv):
         Returns the indices of the states in the canonical ordering as a tensor of shape `batch_shape`.
         """
         states_raw = states.tensor
-
-        canonical_base = self.height ** torch.arange(
-            self.ndim - 1, -1, -1, device=states_raw.device
-        )
-        indices = (canonical_base * states_raw).sum(-1).long()
+        indices = (self._canonical_base * states_raw).sum(-1)
         assert indices.shape == states.batch_shape
         return indices
 
@@ -222,7 +559,7 @@ class HyperGrid(DiscreteEnv):
         rearrange_string += " ndim -> "
         rearrange_string += " ".join([f"n{i}" for i in range(ndim, 0, -1)])
         rearrange_string += " ndim"
-        grid = rearrange(grid, rearrange_string).long()
+        grid = rearrange(grid, rearrange_string).to(self.s0.dtype)
         return self.States(grid)
 
     @property
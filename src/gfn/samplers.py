@@ -1,4 +1,3 @@
-from copy import deepcopy
 from typing import Any, List, Optional, Tuple
 
 import torch
@@ -155,7 +154,7 @@ class Sampler:
             else states.is_sink_state
         )
 
-        trajectories_states: List[States] = [deepcopy(states)]
+        trajectories_states: List[States] = [states.clone()]
         trajectories_actions: List[torch.Tensor] = []
         trajectories_logprobs: List[torch.Tensor] = []
         trajectories_dones = torch.zeros(
@@ -168,7 +167,7 @@ class Sampler:
         step = 0
         all_estimator_outputs = []
 
-        while not all(dones):
+        while not dones.all():
             actions = env.actions_from_batch_shape((n_trajectories,))  # Dummy actions.
             log_probs = torch.full(
                 (n_trajectories,), fill_value=0, dtype=torch.float, device=device
@@ -226,20 +225,20 @@ class Sampler:
                 new_states.is_initial_state
                 if self.estimator.is_backward
                 else sink_states_mask
-            ) & ~dones
-            trajectories_dones[new_dones & ~dones] = step
+            ).logical_and_(~dones)
+            trajectories_dones[new_dones] = step
             try:
-                trajectories_log_rewards[new_dones & ~dones] = env.log_reward(
-                    states[new_dones & ~dones]
-                )
+                trajectories_log_rewards[new_dones] = env.log_reward(states[new_dones])
             except NotImplementedError:
-                trajectories_log_rewards[new_dones & ~dones] = torch.log(
-                    env.reward(states[new_dones & ~dones])
+                trajectories_log_rewards[new_dones] = torch.log(
+                    env.reward(states[new_dones])
                 )
             states = new_states
-            dones = dones | new_dones
+            dones.logical_or_(new_dones)
 
-            trajectories_states.append(deepcopy(states))
+            # The states returned by `_step` and `_backward_step` own fresh tensors and
+            # masks which are never modified in place, so they need not be copied.
+            trajectories_states.append(states)
 
         trajectories_states = stack_states(trajectories_states)
         trajectories_actions = env.Actions.stack(trajectories_actions)
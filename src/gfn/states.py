@@ -1,7 +1,6 @@
 from __future__ import annotations  # This allows to use the class name in type hints
 
 from abc import ABC
-from copy import deepcopy
 from math import prod
 from typing import Callable, ClassVar, List, Optional, Sequence
 
@@ -153,8 +152,18 @@ class States(ABC):
         self.tensor[index] = states.tensor
 
     def clone(self) -> States:
-        """Returns a *detached* clone of the current instance using deepcopy."""
-        return deepcopy(self)
+        """Returns a *detached* clone of the current instance.
+
+        Only the tensors owned by the instance are cloned, which avoids the recursive
+        python-side traversal of `deepcopy` on every environment step. The clone is
+        built with `self.__class__(tensor)`, so subclasses storing additional
+        attributes must override this method to carry them over (see
+        `DiscreteStates.clone`), otherwise they are dropped.
+        """
+        out = self.__class__(self.tensor.detach().clone())
+        if self._log_rewards is not None:
+            out._log_rewards = self._log_rewards.detach().clone()
+        return out
 
     def flatten(self) -> States:
         """Flatten the batch dimension of the states.
@@ -323,33 +332,63 @@ class DiscreteStates(States, ABC):
         super().__init__(tensor)
         assert tensor.shape == self.batch_shape + self.state_shape
 
-        # In the usual case, no masks are provided and we produce these defaults.
+        # In the usual case, no masks are provided and defaults are produced lazily,
+        # on first access. This way, states whose masks are about to be overwritten
+        # (e.g. the output of a step, see `DiscreteEnv.update_masks`) never allocate
+        # or copy masks they do not need.
         # Note: this **must** be updated externally by the env.
-        if forward_masks is None:
-            forward_masks = torch.ones(
+        if forward_masks is not None:
+            assert forward_masks.shape == (*self.batch_shape, self.n_actions)
+        if backward_masks is not None:
+            assert backward_masks.shape == (*self.batch_shape, self.n_actions - 1)
+        self._forward_masks: Optional[torch.Tensor] = forward_masks
+        self._backward_masks: Optional[torch.Tensor] = backward_masks
+
+    @property
+    def forward_masks(self) -> torch.Tensor:
+        """A boolean tensor of shape (*batch_shape, n_actions), all True by default."""
+        if self._forward_masks is None:
+            self._forward_masks = torch.ones(
                 (*self.batch_shape, self.__class__.n_actions),
                 dtype=torch.bool,
                 device=self.__class__.device,
             )
-        if backward_masks is None:
-            backward_masks = torch.ones(
+        return self._forward_masks
+
+    @forward_masks.setter
+    def forward_masks(self, forward_masks: torch.Tensor) -> None:
+        self._forward_masks = forward_masks
+
+    @property
+    def backward_masks(self) -> torch.Tensor:
+        """A boolean tensor of shape (*batch_shape, n_actions - 1), all True by default."""
+        if self._backward_masks is None:
+            self._backward_masks = torch.ones(
                 (*self.batch_shape, self.__class__.n_actions - 1),
                 dtype=torch.bool,
                 device=self.__class__.device,
             )
+        return self._backward_masks
 
-        self.forward_masks: torch.Tensor = forward_masks
-        self.backward_masks: torch.Tensor = backward_masks
-        assert self.forward_masks.shape == (*self.batch_shape, self.n_actions)
-        assert self.backward_masks.shape == (*self.batch_shape, self.n_actions - 1)
+    @backward_masks.setter
+    def backward_masks(self, backward_masks: torch.Tensor) -> None:
+        self._backward_masks = backward_masks
 
-    def clone(self) -> States:
-        """Returns a clone of the current instance."""
-        return self.__class__(
+    def clone(self) -> DiscreteStates:
+        """Returns a clone of the current instance.
+
+        The masks are cloned as well, as they are updated in place by the env after
+        each step (see `set_nonexit_action_masks`). Masks which were never accessed
+        are left to be produced lazily by the clone.
+        """
+        out = self.__class__(
             self.tensor.detach().clone(),
-            self.forward_masks,
-            self.backward_masks,
+            None if self._forward_masks is None else self._forward_masks.clone(),
+            None if self._backward_masks is None else self._backward_masks.clone(),
         )
+        if self._log_rewards is not None:
+            out._log_rewards = self._log_rewards.detach().clone()
+        return out
 
     def _check_both_forward_backward_masks_exist(self):
         assert self.forward_masks is not None and self.backward_masks is not None
@@ -383,6 +422,10 @@ class DiscreteStates(States, ABC):
         return self.__class__(states, forward_masks, backward_masks)
 
     def extend(self, other: States) -> None:
+        # Lazy default masks must be produced before `super().extend` updates the
+        # batch shape, otherwise they would be produced with the extended shape.
+        self._check_both_forward_backward_masks_exist()
+        other._check_both_forward_backward_masks_exist()
         super().extend(other)
         self.forward_masks = torch.cat(
             (self.forward_masks, other.forward_masks), dim=len(self.batch_shape) - 1
@@ -401,6 +444,7 @@ class DiscreteStates(States, ABC):
         Args:
             required_first_dim: The size of the first batch dimension post-expansion.
         """
+        self._check_both_forward_backward_masks_exist()  # See `extend`.
         super().extend_with_sf(required_first_dim)
 
         def _extend(masks, first_dim):
@@ -435,12 +479,8 @@ class DiscreteStates(States, ABC):
                 trajectory - if so, it should be set to True.
         """
         # Resets masks in place to prevent side-effects across steps.
-        self.forward_masks[:] = True
-        if allow_exit:
-            exit_idx = torch.zeros(self.batch_shape + (1,)).to(cond.device)
-        else:
-            exit_idx = torch.ones(self.batch_shape + (1,)).to(cond.device)
-        self.forward_masks[torch.cat([cond, exit_idx], dim=-1).bool()] = False
+        self.forward_masks[..., :-1] = ~cond.bool()
+        self.forward_masks[..., -1] = allow_exit
 
     def set_exit_masks(self, batch_idx):
         """Sets forward masks such that the only allowable next action is to exit.
@@ -451,13 +491,8 @@ class DiscreteStates(States, ABC):
             batch_idx: A Boolean index along the batch dimension, along which to
                 enforce exits.
         """
-        self.forward_masks[batch_idx, :] = torch.cat(
-            [
-                torch.zeros((torch.sum(batch_idx),) + self.s0.shape),
-                torch.ones((torch.sum(batch_idx),) + (1,)),
-            ],
-            dim=-1,
-        ).bool()
+        self.forward_masks[batch_idx, :-1] = False
+        self.forward_masks[batch_idx, -1] = True
 
     def init_forward_masks(self, set_ones: bool = True):
         """Initalizes forward masks.
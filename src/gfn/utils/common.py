@@ -1,4 +1,5 @@
 import random
+from typing import Callable
 
 import numpy as np
 import torch
@@ -26,3 +27,17 @@ def has_log_probs(obj):
         return False
 
     return obj.log_probs is not None and obj.log_probs.nelement() > 0
+
+
+def maybe_compile(fn: Callable, **compile_kwargs) -> Callable:
+    """Returns `torch.compile(fn, **compile_kwargs)` when supported, `fn` otherwise.
+
+    `torch.compile` is only available from torch 2.0, and is not supported on every
+    python version, in which case the function is used eagerly.
+    """
+    if not hasattr(torch, "compile"):
+        return fn
+    try:
+        return torch.compile(fn, **compile_kwargs)
+    except RuntimeError:
+        return fn
@@ -2,7 +2,7 @@ import numpy as np
 import pytest
 import torch
 
-from gfn.env import NonValidActionsError
+from gfn.env import DiscreteEnv, NonValidActionsError
 from gfn.gym import Box, DiscreteEBM, HyperGrid
 
 
@@ -134,6 +134,179 @@ def test_HyperGrid_bwd_step_with_preprocessors(
         states = env._backward_step(states, failing_actions)
 
 
+@pytest.mark.parametrize("ndim", [2, 3])
+def test_HyperGrid_shape_stable_steps(ndim: int):
+    """The HyperGrid transitions must match the generic DiscreteEnv ones."""
+    BATCH_SIZE = 16
+    N_STEPS = 8
+    env = HyperGrid(ndim=ndim, height=4)
+    torch.manual_seed(1234)
+
+    # Forward trajectories, starting from s0.
+    states = env.reset(batch_shape=BATCH_SIZE)
+    for _ in range(N_STEPS):
+        actions_tensor = torch.multinomial(states.forward_masks.float(), 1)
+        actions_tensor[states.is_sink_state] = -1
+        actions = env.actions_from_tensor(actions_tensor)
+        expected = DiscreteEnv._step(env, states, actions)
+        states = env._step(states, actions)
+        assert (states.tensor == expected.tensor).all()
+        assert (states.forward_masks == expected.forward_masks).all()
+        assert (states.backward_masks == expected.backward_masks).all()
+
+    # Backward trajectories, starting from random states.
+    states = env.reset(batch_shape=BATCH_SIZE, random=True, seed=1234)
+    for _ in range(N_STEPS):
+        is_initial = states.is_initial_state
+        masks = states.backward_masks.float()
+        masks[is_initial] = 1.0
+        actions_tensor = torch.multinomial(masks, 1)
+        actions_tensor[is_initial] = -1
+        actions = env.actions_from_tensor(actions_tensor)
+        expected = DiscreteEnv._backward_step(env, states, actions)
+        states = env._backward_step(states, actions)
+        assert (states.tensor == expected.tensor).all()
+        assert (states.forward_masks == expected.forward_masks).all()
+        assert (states.backward_masks == expected.backward_masks).all()
+
+
+def test_HyperGrid_cuda_graph_requires_cuda():
+    env = HyperGrid(ndim=2, height=4)
+    with pytest.raises(ValueError):
+        env.enable_cuda_graph((4,))
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="Requires a GPU.")
+def test_HyperGrid_cuda_graph_rejects_triton():
+    pytest.importorskip("gfn.gym.helpers.hypergrid_triton")
+    env = HyperGrid(ndim=2, height=4, device_str="cuda")
+    assert env._uses_triton_kernels
+    with pytest.raises(ValueError):
+        env.enable_cuda_graph((4,))
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="Requires a GPU.")
+def test_HyperGrid_cuda_graph():
+    """Replaying the captured step must match the eager one."""
+    from gfn.gym.hypergrid import _step_kernel
+
+    BATCH_SIZE = 16
+    N_STEPS = 4
+    env = HyperGrid(ndim=2, height=4, device_str="cuda")
+    # Only the torch kernels are captured, see `enable_cuda_graph`.
+    env._step_fn, env._uses_triton_kernels = _step_kernel, False
+    env.enable_cuda_graph((BATCH_SIZE,))
+    torch.manual_seed(1234)
+
+    states = env.reset(batch_shape=BATCH_SIZE)
+    previous_states, previous_outputs = None, None
+    for _ in range(N_STEPS):
+        actions_tensor = torch.multinomial(states.forward_masks.float(), 1)
+        actions_tensor[states.is_sink_state] = -1
+        actions = env.actions_from_tensor(actions_tensor)
+        expected = env._step_fn(states.tensor, actions.tensor, env.height)
+        new_states = env._step(states, actions)
+        outputs = (
+            new_states.tensor,
+            new_states.forward_masks,
+            new_states.backward_masks,
+        )
+        for output, expected_output in zip(outputs, expected):
+            assert torch.equal(output, expected_output)
+
+        # The states returned by the previous replay must not alias the static outputs.
+        if previous_states is not None:
+            assert torch.equal(previous_states.tensor, previous_outputs[0])
+            assert torch.equal(previous_states.forward_masks, previous_outputs[1])
+            assert torch.equal(previous_states.backward_masks, previous_outputs[2])
+        previous_states = new_states
+        previous_outputs = tuple(output.clone() for output in outputs)
+        states = new_states
+
+
+@pytest.mark.parametrize(
+    "device_str",
+    [
+        "cpu",
+        pytest.param(
+            "cuda",
+            marks=pytest.mark.skipif(
+                not torch.cuda.is_available(), reason="Requires a GPU."
+            ),
+        ),
+    ],
+)
+@pytest.mark.parametrize("reward_cos", [False, True])
+@pytest.mark.parametrize("height", [11, 16, 29, 31])
+def test_HyperGrid_reward(height: int, reward_cos: bool, device_str: str):
+    """The reward must match its definition.
+
+    The polynomial reward must be bit-exact, as rounding differences flip its
+    threshold comparisons, including once compiled on cuda. The compiled cosine
+    reward uses its own `exp`/`cos` implementations, so it is only close.
+    """
+    NDIM = 2
+    R0, R1, R2 = 0.1, 0.5, 2.0
+    env = HyperGrid(
+        ndim=NDIM, height=height, reward_cos=reward_cos, device_str=device_str
+    )
+    states = env.all_states
+
+    ax = abs(states.tensor.float() / (height - 1) - 0.5)
+    if not reward_cos:
+        expected = (
+            R0 + (0.25 < ax).prod(-1) * R1 + ((0.3 < ax) * (ax < 0.4)).prod(-1) * R2
+        )
+        assert torch.equal(env.reward(states), expected)
+    else:
+        pdf = 1.0 / (2 * torch.pi) ** 0.5 * torch.exp(-((ax * 5) ** 2) / 2)
+        expected = R0 + ((torch.cos(ax * 50) + 1) * pdf).prod(-1) * R1
+        torch.testing.assert_close(env.reward(states), expected)
+
+
+@pytest.mark.parametrize(
+    "module_name, device_str",
+    [
+        ("hypergrid_numba", "cpu"),
+        pytest.param(
+            "hypergrid_triton",
+            "cuda",
+            marks=pytest.mark.skipif(
+                not torch.cuda.is_available(), reason="Requires a GPU."
+            ),
+        ),
+    ],
+)
+@pytest.mark.parametrize("backward", [False, True])
+def test_HyperGrid_kernels(module_name: str, device_str: str, backward: bool):
+    """The numba (CPU) and triton (GPU) kernels must match the torch ones."""
+    kernels = pytest.importorskip(f"gfn.gym.helpers.{module_name}")
+    from gfn.gym.hypergrid import _backward_step_kernel, _step_kernel
+
+    NDIM = 3
+    HEIGHT = 4
+    ND_BATCH_SHAPE = (8, 50)
+    env = HyperGrid(ndim=NDIM, height=HEIGHT, device_str=device_str)
+
+    states = env.reset(batch_shape=ND_BATCH_SHAPE, random=True, seed=1234)
+    states.tensor[0] = env.sf  # Some sink states.
+    states.tensor[1] = env.s0  # Some initial states.
+    actions = torch.randint(
+        -1, env.n_actions, ND_BATCH_SHAPE + (1,), device=torch.device(device_str)
+    )
+
+    if backward:
+        actions = actions.clamp(max=NDIM - 1)
+        expected = _backward_step_kernel(states.tensor, actions, HEIGHT)
+        outputs = kernels.backward_step_kernel(states.tensor, actions, HEIGHT)
+    else:
+        expected = _step_kernel(states.tensor, actions, HEIGHT)
+        outputs = kernels.step_kernel(states.tensor, actions, HEIGHT)
+
+    for output, expected_output in zip(outputs, expected):
+        assert torch.equal(output, expected_output)
+
+
 def test_DiscreteEBM_fwd_step():
     NDIM = 2
     BATCH_SIZE = 4
@@ -194,6 +367,89 @@ def test_DiscreteEBM_bwd_step():
         states = env._backward_step(states, failing_actions)
 
 
+def test_DiscreteEBM_lazy_masks():
+    NDIM = 2
+    BATCH_SIZE = 4
+
+    env = DiscreteEBM(ndim=NDIM)
+    states = env.States(env.reset(batch_shape=BATCH_SIZE).tensor)
+    # Default masks are only produced on first access.
+    assert states._forward_masks is None and states._backward_masks is None
+    assert states.clone()._forward_masks is None
+    assert states.forward_masks.all() and states.backward_masks.all()
+
+    states = env.reset(batch_shape=BATCH_SIZE)
+    actions = env.actions_from_tensor(format_tensor([0, 1, 2, 3]))
+    new_states = env._step(states, actions)
+
+    # The masks of the stepped states are recomputed, not copied from the parents.
+    expected = env.States(new_states.tensor.clone())
+    env.update_masks(expected)
+    assert new_states.forward_masks is not states.forward_masks
+    assert torch.equal(new_states.forward_masks, expected.forward_masks)
+    assert torch.equal(new_states.backward_masks, expected.backward_masks)
+
+
+def test_set_exit_masks():
+    """Only the exit action is allowed in the selected states, others are untouched."""
+    BATCH_SHAPE = (4, 3)
+    env = HyperGrid(ndim=2, height=4)
+    states = env.reset(batch_shape=BATCH_SHAPE, random=True, seed=1234)
+    masks = states.forward_masks.clone()
+    batch_idx = (
+        torch.rand(BATCH_SHAPE, generator=torch.Generator().manual_seed(0)) < 0.5
+    )
+    n_exits = int(batch_idx.sum())
+
+    states.set_exit_masks(batch_idx)
+
+    expected = masks.clone()
+    expected[batch_idx, :] = torch.cat(
+        [
+            torch.zeros((n_exits,) + env.s0.shape, dtype=torch.bool),
+            torch.ones((n_exits, 1), dtype=torch.bool),
+        ],
+        dim=-1,
+    )
+    assert 0 < n_exits < batch_idx.numel()
+    assert torch.equal(states.forward_masks, expected)
+    assert torch.equal(states.forward_masks[~batch_idx], masks[~batch_idx])
+
+
+@pytest.mark.parametrize("env_name", ["HyperGrid", "Box"])
+def test_actions_is_exit_and_is_dummy(env_name: str):
+    """The reference actions are broadcast over the batch when comparing."""
+    BATCH_SHAPE = (4, 3)
+    env = HyperGrid(ndim=2, height=4) if env_name == "HyperGrid" else Box(delta=0.1)
+
+    actions_tensor = env.Actions.make_dummy_actions(BATCH_SHAPE).tensor
+    actions_tensor[0] = env.Actions.exit_action
+    actions = env.actions_from_tensor(actions_tensor)
+    is_exit = torch.zeros(BATCH_SHAPE, dtype=torch.bool)
+    is_exit[0] = True
+
+    assert torch.equal(actions.is_exit, is_exit)
+    assert torch.equal(actions.is_dummy, ~is_exit)
+    # Comparing against a full batch of actions is still supported.
+    assert torch.equal(actions.compare(actions_tensor), torch.ones(BATCH_SHAPE).bool())
+
+
+@pytest.mark.parametrize("batch_shape", [(3,), (3, 2)])
+@pytest.mark.parametrize("env_name", ["HyperGrid", "DiscreteEBM"])
+def test_DiscreteStates_extend_empty(env_name: str, batch_shape: tuple):
+    """Extending an empty batch, whose masks were never produced, keeps them aligned."""
+    env = HyperGrid(ndim=2, height=4) if env_name == "HyperGrid" else DiscreteEBM(2)
+    states = env.States.from_batch_shape((0,) * len(batch_shape))
+    other = env.reset(batch_shape=batch_shape)
+    states.extend(other)
+
+    assert states.batch_shape == batch_shape
+    assert states.forward_masks.shape == batch_shape + (env.n_actions,)
+    assert states.backward_masks.shape == batch_shape + (env.n_actions - 1,)
+    assert torch.equal(states.forward_masks, other.forward_masks)
+    assert torch.equal(states[0].tensor, other[0].tensor)
+
+
 @pytest.mark.parametrize("delta", [0.1, 0.5, 1.0])
 def test_box_fwd_step(delta: float):
     env = Box(delta=delta)
@@ -315,4 +571,6 @@ def test_get_grid():
     assert Z.log().item() == env.log_partition
 
     # State indices of the grid are ordered from 0:HEIGHT**2.
-    assert (env.get_states_indices(grid).ravel() == torch.arange(HEIGHT**2)).all()
+    indices = env.get_states_indices(grid)
+    assert indices.dtype == torch.long
+    assert (indices.ravel() == torch.arange(HEIGHT**2)).all()